@@ -2,17 +2,37 @@
 """
 ORBIT-SEC Dashboard - Reads REAL scan results from SQLite
 """
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from pathlib import Path
-import sqlite3
+from functools import lru_cache, wraps
+import asyncio
+import os
+import re
+import shutil
+import threading
+import orjson
 from datetime import datetime
 
-app = FastAPI(title="ORBIT-SEC Dashboard", version="1.0.0")
+from queries import (
+    DB_PATH,
+    clear_scan_cache,
+    db_cursor,
+    get_latest_counts,
+    get_latest_scan,
+    get_scan_etag,
+    migrate_database,
+)
+from templating import make_templates
+
+app = FastAPI(title="ORBIT-SEC Dashboard", version="1.0.0", default_response_class=ORJSONResponse)
+
+# /api/scans streams every finding of the latest scan; gzip it for remote browsers
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Setup templates and static files
-templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
+templates = make_templates()
 
 # Mount static files
 from fastapi.staticfiles import StaticFiles
@@ -20,94 +40,38 @@ static_path = Path(__file__).parent / "static"
 if static_path.exists():
     app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 
-DB_PATH = Path(__file__).parent.parent / "results.db"
-
-def get_latest_scan():
-    """Get most recent scan from database"""
-    if not DB_PATH.exists():
-        return None
-
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    # Get latest scan
-    c.execute("SELECT id, target, timestamp, status FROM scans ORDER BY id DESC LIMIT 1")
-    scan = c.fetchone()
+def etag_matches(request, etag):
+    """Check the request's If-None-Match header against an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
 
-    if not scan:
-        conn.close()
-        return None
+STREAM_BATCH = 500  # findings serialized per chunk
 
-    scan_id, target, timestamp, status = scan
+def iter_scan_json(scan_data):
+    """Serialize scan results incrementally so large scans are never encoded in one buffer"""
+    header = {k: v for k, v in scan_data.items() if k != "scans"}
+    yield orjson.dumps(header)[:-1] + b',"scans":{'
 
-    # Get vulnerabilities for this scan
-    c.execute("""SELECT id, scan_type, severity, package, vulnerability, description, file, line, installed_version, fixed_version
-                 FROM vulnerabilities WHERE scan_id = ?""", (scan_id,))
-    vulns = c.fetchall()
+    for i, (name, scan) in enumerate(scan_data["scans"].items()):
+        summary = {k: v for k, v in scan.items() if k != "findings"}
+        yield (b"," if i else b"") + orjson.dumps(name) + b":" + orjson.dumps(summary)[:-1] + b',"findings":['
 
-    conn.close()
+        findings = scan["findings"]
+        for start in range(0, len(findings), STREAM_BATCH):
+            chunk = orjson.dumps(findings[start:start + STREAM_BATCH])[1:-1]
+            yield (b"," if start else b"") + chunk
 
-    # Organize by scan type
-    dependency_vulns = [v for v in vulns if v[1] == "dependency"]
-    secret_vulns = [v for v in vulns if v[1] == "secret"]
+        yield b"]}"
 
-    # Count by severity
-    def count_severity(vuln_list):
-        critical = sum(1 for v in vuln_list if v[2] == "CRITICAL")
-        high = sum(1 for v in vuln_list if v[2] == "HIGH")
-        medium = sum(1 for v in vuln_list if v[2] == "MEDIUM")
-        low = sum(1 for v in vuln_list if v[2] == "LOW")
-        return {"critical": critical, "high": high, "medium": medium, "low": low, "total": len(vuln_list)}
+    yield b"}}"
 
-    dep_counts = count_severity(dependency_vulns)
-    secret_counts = count_severity(secret_vulns)
-
-    return {
-        "scan_id": scan_id,
-        "target": target,
-        "timestamp": timestamp,
-        "status": status,
-        "total_vulnerabilities": dep_counts["total"] + secret_counts["total"],
-        "critical_count": dep_counts["critical"] + secret_counts["critical"],
-        "high_count": dep_counts["high"] + secret_counts["high"],
-        "medium_count": dep_counts["medium"] + secret_counts["medium"],
-        "low_count": dep_counts["low"] + secret_counts["low"],
-        "scans": {
-            "dependencies": {
-                "name": "Dependency Scan (Trivy)",
-                "status": "FAILED" if dep_counts["total"] > 0 else "PASSED",
-                **dep_counts,
-                "findings": [
-                    {
-                        "id": v[0],
-                        "severity": v[2],
-                        "cve": v[4],
-                        "package": v[3],
-                        "description": v[5],
-                        "file": v[6],
-                        "line": v[7],
-                        "installed_version": v[8] if len(v) > 8 else "",
-                        "fixed_version": v[9] if len(v) > 9 else ""
-                    } for v in dependency_vulns  # Show ALL findings
-                ]
-            },
-            "secrets": {
-                "name": "Secret Detection (Gitleaks)",
-                "status": "DETECTED" if secret_counts["total"] > 0 else "PASSED",
-                **secret_counts,
-                "findings": [
-                    {
-                        "id": v[0],
-                        "severity": v[2],
-                        "type": v[3],
-                        "description": v[5],
-                        "file": v[6],
-                        "line": v[7]
-                    } for v in secret_vulns  # Show ALL findings
-                ]
-            }
-        }
-    }
+@app.on_event("startup")
+def prepare_database():
+    """Bring databases from older scanners up to date"""
+    migrate_database()
 
 @app.get("/", response_class=HTMLResponse)
 async def dashboard(request: Request):
@@ -115,8 +79,12 @@ async def dashboard(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/api/scans")
-async def get_scans():
+async def get_scans(request: Request):
     """Get latest scan results"""
+    etag = get_scan_etag()
+    if etag and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
     scan_data = get_latest_scan()
 
     if not scan_data:
@@ -128,14 +96,19 @@ async def get_scans():
             "scans": {}
         }
 
-    return scan_data
+    return StreamingResponse(iter_scan_json(scan_data), media_type="application/json",
+                             headers={"ETag": etag} if etag else None)
 
 @app.get("/api/summary")
-async def get_summary():
+async def get_summary(request: Request, response: Response):
     """Get vulnerability summary"""
-    scan_data = get_latest_scan()
+    etag = get_scan_etag()
+    if etag and etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
 
-    if not scan_data:
+    counts = get_latest_counts()
+
+    if not counts:
         return {
             "error": "No scans found",
             "status": "NO_DATA",
@@ -146,16 +119,18 @@ async def get_summary():
             "low": 0
         }
 
+    if etag:
+        response.headers["ETag"] = etag
     return {
-        "status": scan_data["status"],
-        "total_vulnerabilities": scan_data["total_vulnerabilities"],
-        "critical": scan_data["critical_count"],
-        "high": scan_data["high_count"],
-        "medium": scan_data["medium_count"],
-        "low": scan_data["low_count"],
-        "scan_types": len(scan_data["scans"]),
-        "timestamp": scan_data["timestamp"],
-        "target": scan_data["target"]
+        "status": counts["status"],
+        "total_vulnerabilities": counts["total_vulnerabilities"],
+        "critical": counts["critical_count"],
+        "high": counts["high_count"],
+        "medium": counts["medium_count"],
+        "low": counts["low_count"],
+        "scan_types": 2,  # dependencies + secrets
+        "timestamp": counts["timestamp"],
+        "target": counts["target"]
     }
 
 @app.get("/api/health")
@@ -169,20 +144,51 @@ async def health():
         "timestamp": datetime.now().isoformat()
     }
 
-@app.post("/api/fix/{vuln_id}")
-async def fix_vulnerability(vuln_id: int):
+@app.post("/api/cache/invalidate")
+async def invalidate_cache():
+    """Drop cached scan results (call after ingesting a new scan)"""
+    clear_scan_cache()
+    return {"success": True}
+
+def write_atomic(path, content):
+    """Write content to a sibling temp file, then swap it into place"""
+    # Follow symlinks so the real file is updated, not replaced by a copy
+    path = path.resolve()
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    shutil.copymode(path, tmp_path)
+    os.replace(tmp_path, path)
+
+@lru_cache(maxsize=512)
+def package_pattern(package):
+    """Compiled regex matching a package's pinned requirement line"""
+    return re.compile(rf'^{re.escape(package)}==.*$', re.MULTILINE)
+
+# Fixes rewrite shared requirement files, so they run one at a time
+_fix_lock = threading.Lock()
+
+def serialized(func):
+    """Hold the fix lock for the duration of a call"""
+    @wraps(func)
+    def wrapper(*args):
+        with _fix_lock:
+            return func(*args)
+    return wrapper
+
+@serialized
+def apply_fix(vuln_id):
     """Fix a single vulnerability by updating requirements file"""
     if not DB_PATH.exists():
         return {"error": "No scan database found"}
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
     # Get vulnerability details
-    c.execute("""SELECT package, fixed_version, file, installed_version
-                 FROM vulnerabilities WHERE id = ?""", (vuln_id,))
-    vuln = c.fetchone()
-    conn.close()
+    with db_cursor() as c:
+        c.execute("""SELECT package, fixed_version, file, installed_version
+                     FROM vulnerabilities WHERE id = ?""", (vuln_id,))
+        vuln = c.fetchone()
 
     if not vuln:
         return {"error": "Vulnerability not found"}
@@ -211,35 +217,30 @@ async def fix_vulnerability(vuln_id: int):
         if not target_file:
             return {"error": f"File not found: {file_path} (tried {[str(p) for p in possible_paths]})"}
 
-        # Backup original
-        backup_path = target_file.with_suffix('.txt.backup')
-
-        # Read current content
-        with open(target_file, 'r') as f:
-            content = f.read()
-
-        # Save backup
-        with open(backup_path, 'w') as f:
-            f.write(content)
+        content = target_file.read_text()
 
         # Replace version
+        new_line = f"{package}=={fixed_version}"
         if installed_version:
-            old_line = f"{package}=={installed_version}"
-            new_line = f"{package}=={fixed_version}"
+            updated_content = content.replace(f"{package}=={installed_version}", new_line)
         else:
             # Fallback: find any line with the package
-            import re
-            pattern = rf'^{re.escape(package)}==.*$'
-            new_line = f"{package}=={fixed_version}"
-            content = re.sub(pattern, new_line, content, flags=re.MULTILINE)
-
-        if installed_version and old_line in content:
-            updated_content = content.replace(old_line, new_line)
-        else:
-            updated_content = content
+            updated_content = package_pattern(package).sub(new_line, content)
+
+        if updated_content == content:
+            return {
+                "success": True,
+                "noop": True,
+                "package": package,
+                "old_version": installed_version,
+                "new_version": fixed_version,
+                "file": file_path
+            }
 
-        with open(target_file, 'w') as f:
-            f.write(updated_content)
+        # Backup original only when something changes
+        backup_path = target_file.with_suffix('.txt.backup')
+        backup_path.write_text(content)
+        write_atomic(target_file, updated_content)
 
         return {
             "success": True,
@@ -253,22 +254,19 @@ async def fix_vulnerability(vuln_id: int):
         return {"error": str(e)}
 
 
-@app.post("/api/fix-all")
-async def fix_all_vulnerabilities():
+@serialized
+def apply_all_fixes():
     """Fix all vulnerabilities with available fixes"""
     if not DB_PATH.exists():
         return {"error": "No scan database found"}
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
     # Get all fixable vulnerabilities
-    c.execute("""SELECT id, package, fixed_version, file, installed_version
-                 FROM vulnerabilities
-                 WHERE fixed_version != '' AND fixed_version IS NOT NULL
-                 AND file LIKE '%requirements.txt%'""")
-    vulns = c.fetchall()
-    conn.close()
+    with db_cursor() as c:
+        c.execute("""SELECT id, package, fixed_version, file, installed_version
+                     FROM vulnerabilities
+                     WHERE fixed_version != '' AND fixed_version IS NOT NULL
+                     AND file LIKE '%requirements.txt%'""")
+        vulns = c.fetchall()
 
     if not vulns:
         return {"error": "No fixable vulnerabilities found"}
@@ -306,30 +304,37 @@ async def fix_all_vulnerabilities():
             if not target_file:
                 continue
 
-            # Read and backup
-            with open(target_file, 'r') as f:
-                content = f.read()
+            content = target_file.read_text()
 
-            backup_path = target_file.with_suffix('.txt.backup')
-            with open(backup_path, 'w') as f:
-                f.write(content)
-
-            # Apply all fixes
-            updated_content = content
+            # Apply all fixes in a single pass; the first fix listed for a pin wins
+            replacements = {}
             for fix in fixes:
                 if fix['installed']:
                     old_line = f"{fix['package']}=={fix['installed']}"
-                    new_line = f"{fix['package']}=={fix['fixed']}"
-                    updated_content = updated_content.replace(old_line, new_line)
-                    fixed_count += 1
+                    replacements.setdefault(old_line, f"{fix['package']}=={fix['fixed']}")
+
+            if not replacements:
+                continue
+
+            # Longest pins first so 'pkg==1.2.3' is not shadowed by 'pkg==1.2'
+            pattern = re.compile("|".join(
+                re.escape(old_line) for old_line in sorted(replacements, key=len, reverse=True)
+            ))
+            updated_content, applied = pattern.subn(lambda m: replacements[m.group(0)], content)
+
+            if updated_content == content:
+                continue
+
+            fixed_count += applied
 
-            # Write updated file
-            with open(target_file, 'w') as f:
-                f.write(updated_content)
+            # Backup and write updated file
+            backup_path = target_file.with_suffix('.txt.backup')
+            backup_path.write_text(content)
+            write_atomic(target_file, updated_content)
 
             results.append({
                 "file": file_path,
-                "fixes_applied": len(fixes),
+                "fixes_applied": applied,
                 "backup": str(backup_path.name)
             })
         except Exception as e:
@@ -344,6 +349,17 @@ async def fix_all_vulnerabilities():
         "files_updated": results
     }
 
+# Database and file I/O run in a worker thread so scan polls aren't blocked
+@app.post("/api/fix/{vuln_id}")
+async def fix_vulnerability(vuln_id: int):
+    """Fix a single vulnerability by updating requirements file"""
+    return await asyncio.to_thread(apply_fix, vuln_id)
+
+@app.post("/api/fix-all")
+async def fix_all_vulnerabilities():
+    """Fix all vulnerabilities with available fixes"""
+    return await asyncio.to_thread(apply_all_fixes)
+
 if __name__ == "__main__":
     import uvicorn
     print("🚀 Starting ORBIT-SEC Dashboard...")
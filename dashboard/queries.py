@@ -0,0 +1,276 @@
+"""
+ORBIT-SEC Dashboard - SQLite queries for scan results
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass
+from hashlib import blake2b
+from pathlib import Path
+from typing import Optional
+import sqlite3
+import threading
+import time
+
+DB_PATH = Path(__file__).parent.parent / "results.db"
+
+# One connection shared by all requests instead of reconnecting per request
+_db_conn = None
+_db_lock = threading.Lock()
+
+@contextmanager
+def db_cursor():
+    """Borrow a cursor on the shared database connection"""
+    global _db_conn
+    with _db_lock:
+        if _db_conn is None:
+            conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            # WAL lets the dashboard read while a scan is being written
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA cache_size=-20000")
+            conn.execute("PRAGMA mmap_size=268435456")
+            _db_conn = conn
+        yield _db_conn.cursor()
+
+# Scan results only change when a new scan is ingested, so dashboard polls
+# are served from memory, keyed on the latest scan id
+SCAN_CACHE_TTL = 15  # seconds
+_scan_cache = {}  # (kind, scan_id) -> (expires_at, value)
+
+def clear_scan_cache():
+    """Drop all cached scan results"""
+    _scan_cache.clear()
+
+def _cache_get(kind, scan_id):
+    entry = _scan_cache.get((kind, scan_id))
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+def _cache_put(kind, scan_id, value):
+    # Entries for older scans can never be hit again
+    for key in [k for k in _scan_cache if k[1] != scan_id]:
+        del _scan_cache[key]
+    _scan_cache[(kind, scan_id)] = (time.monotonic() + SCAN_CACHE_TTL, value)
+    return value
+
+SEVERITIES = ("critical", "high", "medium", "low")
+
+# Findings are kept for every cached scan, so they use slotted dataclasses
+# (serialized natively by orjson) rather than per-finding dicts.
+# Field order matches the SELECTs in get_latest_scan().
+@dataclass
+class DependencyFinding:
+    __slots__ = ("id", "severity", "cve", "package", "description", "file", "line",
+                 "installed_version", "fixed_version")
+    id: int
+    severity: str
+    cve: str
+    package: str
+    description: str
+    file: str
+    line: Optional[int]
+    installed_version: Optional[str]
+    fixed_version: Optional[str]
+
+@dataclass
+class SecretFinding:
+    __slots__ = ("id", "severity", "type", "description", "file", "line")
+    id: int
+    severity: str
+    type: str
+    description: str
+    file: str
+    line: Optional[int]
+
+def get_severity_counts(c, scan_id):
+    """Count dependency and secret findings by severity for a scan"""
+    counts = {
+        scan_type: {**dict.fromkeys(SEVERITIES, 0), "total": 0}
+        for scan_type in ("dependency", "secret")
+    }
+
+    # Counts materialized by the scanner at ingest time
+    c.execute("""SELECT scan_type, critical, high, medium, low, total FROM scan_summaries
+                 WHERE scan_id = ?""", (scan_id,))
+    rows = c.fetchall()
+    for scan_type, critical, high, medium, low, total in rows:
+        if scan_type in counts:
+            counts[scan_type] = {"critical": critical, "high": high, "medium": medium, "low": low, "total": total}
+
+    if rows:
+        return counts["dependency"], counts["secret"]
+
+    # Scans ingested without a summary: aggregate the raw findings
+    c.execute("""SELECT scan_type, severity, COUNT(*) FROM vulnerabilities
+                 WHERE scan_id = ? GROUP BY scan_type, severity""", (scan_id,))
+    for scan_type, severity, count in c.fetchall():
+        bucket = counts.get(scan_type)
+        if bucket is None:
+            continue
+        severity = (severity or "").lower()
+        if severity in SEVERITIES:
+            bucket[severity] += count
+        bucket["total"] += count
+
+    return counts["dependency"], counts["secret"]
+
+def get_scan_totals(c, scan_id):
+    """Get scan metadata and overall severity totals for a scan"""
+    c.execute("SELECT target, timestamp, status FROM scans WHERE id = ?", (scan_id,))
+    target, timestamp, status = c.fetchone()
+
+    dep_counts, secret_counts = get_severity_counts(c, scan_id)
+
+    totals = {
+        "scan_id": scan_id,
+        "target": target,
+        "timestamp": timestamp,
+        "status": status,
+        "total_vulnerabilities": dep_counts["total"] + secret_counts["total"],
+        "critical_count": dep_counts["critical"] + secret_counts["critical"],
+        "high_count": dep_counts["high"] + secret_counts["high"],
+        "medium_count": dep_counts["medium"] + secret_counts["medium"],
+        "low_count": dep_counts["low"] + secret_counts["low"],
+    }
+    return totals, dep_counts, secret_counts
+
+def get_latest_counts():
+    """Get severity totals for the most recent scan without fetching findings"""
+    if not DB_PATH.exists():
+        return None
+
+    with db_cursor() as c:
+        c.execute("SELECT MAX(id) FROM scans")
+        scan_id = c.fetchone()[0]
+
+        if scan_id is None:
+            return None
+
+        cached = _cache_get("counts", scan_id)
+        if cached:
+            return cached
+
+        # Project the totals straight from the materialized summaries
+        c.execute("""SELECT s.target, s.timestamp, s.status,
+                            SUM(ss.total), SUM(ss.critical), SUM(ss.high), SUM(ss.medium), SUM(ss.low)
+                     FROM scans s JOIN scan_summaries ss ON ss.scan_id = s.id
+                     WHERE s.id = ?""", (scan_id,))
+        target, timestamp, status, total, critical, high, medium, low = c.fetchone()
+
+        if total is None:
+            # No summary rows for this scan: aggregate the raw findings
+            totals, _, _ = get_scan_totals(c, scan_id)
+        else:
+            totals = {
+                "scan_id": scan_id,
+                "target": target,
+                "timestamp": timestamp,
+                "status": status,
+                "total_vulnerabilities": total,
+                "critical_count": critical,
+                "high_count": high,
+                "medium_count": medium,
+                "low_count": low,
+            }
+
+    return _cache_put("counts", scan_id, totals)
+
+def get_latest_scan():
+    """Get most recent scan from database"""
+    if not DB_PATH.exists():
+        return None
+
+    with db_cursor() as c:
+        # Get latest scan id (cache key)
+        c.execute("SELECT MAX(id) FROM scans")
+        scan_id = c.fetchone()[0]
+
+        if scan_id is None:
+            return None
+
+        cached = _cache_get("scan", scan_id)
+        if cached:
+            return cached
+
+        totals, dep_counts, secret_counts = get_scan_totals(c, scan_id)
+
+        # Get vulnerabilities for this scan, only the columns each scan type shows
+        c.execute("""SELECT id, severity, vulnerability AS cve, package, description, file, line,
+                            installed_version, fixed_version
+                     FROM vulnerabilities WHERE scan_id = ? AND scan_type = 'dependency'
+                     ORDER BY id""", (scan_id,))
+        dependency_vulns = c.fetchall()
+
+        c.execute("""SELECT id, severity, package AS type, description, file, line
+                     FROM vulnerabilities WHERE scan_id = ? AND scan_type = 'secret'
+                     ORDER BY id""", (scan_id,))
+        secret_vulns = c.fetchall()
+
+    scan_data = {
+        **totals,
+        "scans": {
+            "dependencies": {
+                "name": "Dependency Scan (Trivy)",
+                "status": "FAILED" if dep_counts["total"] > 0 else "PASSED",
+                **dep_counts,
+                "findings": [DependencyFinding(*v) for v in dependency_vulns]  # Show ALL findings
+            },
+            "secrets": {
+                "name": "Secret Detection (Gitleaks)",
+                "status": "DETECTED" if secret_counts["total"] > 0 else "PASSED",
+                **secret_counts,
+                "findings": [SecretFinding(*v) for v in secret_vulns]  # Show ALL findings
+            }
+        }
+    }
+
+    return _cache_put("scan", scan_id, scan_data)
+
+def get_scan_etag():
+    """Cheap validator for the latest scan results, used for conditional GETs"""
+    if not DB_PATH.exists():
+        return None
+
+    with db_cursor() as c:
+        c.execute("SELECT MAX(id) FROM scans")
+        scan_id = c.fetchone()[0]
+        if scan_id is None:
+            return None
+        c.execute("SELECT COUNT(*) FROM vulnerabilities WHERE scan_id = ?", (scan_id,))
+        count = c.fetchone()[0]
+
+    digest = blake2b(f"{scan_id}:{count}".encode(), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+def migrate_database():
+    """Add indexes and per-scan summaries to databases from older scanners"""
+    if not DB_PATH.exists():
+        return
+
+    with db_cursor() as c:
+        # scans.id is the rowid, so MAX(id) is already a b-tree seek
+        c.execute("""CREATE INDEX IF NOT EXISTS idx_vuln_scan
+                     ON vulnerabilities(scan_id, scan_type, severity)""")
+
+        c.execute("""CREATE TABLE IF NOT EXISTS scan_summaries
+                     (scan_id INTEGER,
+                      scan_type TEXT,
+                      critical INTEGER,
+                      high INTEGER,
+                      medium INTEGER,
+                      low INTEGER,
+                      total INTEGER,
+                      PRIMARY KEY(scan_id, scan_type),
+                      FOREIGN KEY(scan_id) REFERENCES scans(id))""")
+
+        # Backfill scans that were ingested before summaries existed
+        c.execute("""INSERT OR IGNORE INTO scan_summaries
+                     (scan_id, scan_type, critical, high, medium, low, total)
+                     SELECT scan_id, scan_type,
+                            SUM(severity = 'CRITICAL'), SUM(severity = 'HIGH'),
+                            SUM(severity = 'MEDIUM'), SUM(severity = 'LOW'), COUNT(*)
+                     FROM vulnerabilities
+                     WHERE scan_id NOT IN (SELECT scan_id FROM scan_summaries)
+                     GROUP BY scan_id, scan_type""")
+        c.connection.commit()
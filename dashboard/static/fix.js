@@ -12,7 +12,13 @@ async function fixVulnerability(vulnId, packageName) {
 
         const result = await response.json();
 
-        if (result.success) {
+        if (result.success && result.noop) {
+            btn.textContent = '✓ Up to date';
+            btn.style.background = '#10b981';
+
+            alert(`ℹ️ Nothing to change for ${packageName} in ${result.file}.\n\n` +
+                  `The pin is already updated or was not found; no backup was written.`);
+        } else if (result.success) {
             btn.textContent = '✓ Fixed!';
             btn.style.background = '#10b981';
 
@@ -0,0 +1,36 @@
+"""
+Shared Jinja2 template setup for the ORBIT-SEC dashboards
+"""
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+JINJA_CACHE_DIRS = [
+    Path(__file__).parent / ".jinja_cache",
+    Path(tempfile.gettempdir()) / "orbit-sec-jinja-cache",  # read-only installs
+]
+
+
+def bytecode_cache():
+    """First writable cache directory as a bytecode cache, or None to compile in memory"""
+    for directory in JINJA_CACHE_DIRS:
+        try:
+            directory.mkdir(exist_ok=True)
+        except OSError:
+            continue
+        if os.access(directory, os.W_OK):
+            return FileSystemBytecodeCache(str(directory))
+    return None
+
+
+def make_templates():
+    """Dashboard templates with compiled bytecode reused across restarts"""
+    templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    templates.env.bytecode_cache = bytecode_cache()
+    # Templates only change on deploy, so skip the per-render mtime check
+    templates.env.auto_reload = False
+    return templates
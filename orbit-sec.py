@@ -4,24 +4,65 @@ ORBIT-SEC - Standalone Security Scanner
 Scans any project for vulnerabilities and launches dashboard
 """
 import sys
+import shutil
 import subprocess
-import json
 import sqlite3
+import tempfile
+import threading
+import ijson
+import orjson
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
 from datetime import datetime
 import webbrowser
 import time
 
+class Severity(IntEnum):
+    """Finding severity, ordered so findings can be compared by rank"""
+    UNKNOWN = 0
+    LOW = 1
+    MEDIUM = 2
+    HIGH = 3
+    CRITICAL = 4
+
+def parse_severity(raw):
+    """Map a scanner's severity string to a Severity (UNKNOWN if unrecognized)"""
+    return Severity.__members__.get(raw, Severity.UNKNOWN)
+
+@lru_cache(maxsize=None)
+def have_tool(name):
+    """Check whether an executable is on PATH (cached for the process)"""
+    return shutil.which(name) is not None
+
 class Scanner:
     def __init__(self, target_path):
         self.target = Path(target_path).resolve()
         self.db_path = Path(__file__).parent / "results.db"
+        # One connection for the scanner's lifetime; transactions are explicit
+        self.conn = self.connect()
         self.setup_database()
 
+    def connect(self):
+        """Open the results database with write-friendly pragmas"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        # WAL avoids an fsync per commit and lets the dashboard read during scans
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    def close(self):
+        """Close the results database connection"""
+        self.conn.close()
+
     def setup_database(self):
         """Create SQLite database for storing scan results"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.conn.cursor()
 
         c.execute('''CREATE TABLE IF NOT EXISTS scans
                      (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -43,8 +84,23 @@ class Scanner:
                       fixed_version TEXT,
                       FOREIGN KEY(scan_id) REFERENCES scans(id))''')
 
-        conn.commit()
-        conn.close()
+        # Same definition as the dashboard's migration, so either may create it
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_vuln_scan
+                     ON vulnerabilities(scan_id, scan_type, severity)''')
+        c.execute('''CREATE INDEX IF NOT EXISTS idx_vuln_severity
+                     ON vulnerabilities(severity)''')
+
+        # Severity counts per scan and scan type, written once at ingest
+        c.execute('''CREATE TABLE IF NOT EXISTS scan_summaries
+                     (scan_id INTEGER,
+                      scan_type TEXT,
+                      critical INTEGER,
+                      high INTEGER,
+                      medium INTEGER,
+                      low INTEGER,
+                      total INTEGER,
+                      PRIMARY KEY(scan_id, scan_type),
+                      FOREIGN KEY(scan_id) REFERENCES scans(id))''')
 
     def check_dependencies(self):
         """Verify Trivy and Gitleaks are installed"""
@@ -52,10 +108,10 @@ class Scanner:
 
         missing = []
 
-        if subprocess.run(["which", "trivy"], capture_output=True).returncode != 0:
+        if not have_tool("trivy"):
             missing.append("trivy")
 
-        if subprocess.run(["which", "gitleaks"], capture_output=True).returncode != 0:
+        if not have_tool("gitleaks"):
             missing.append("gitleaks")
 
         if missing:
@@ -73,37 +129,52 @@ class Scanner:
         """Run Trivy filesystem scan"""
         print(f"\nRunning Trivy scan on {self.target}...")
 
-        try:
-            result = subprocess.run(
-                ["trivy", "fs", "--format", "json", "--severity", "CRITICAL,HIGH,MEDIUM,LOW", str(self.target)],
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-
-            if result.returncode not in [0, 1]:  # 1 means vulnerabilities found
-                print(f"Warning: Trivy exited with code {result.returncode}")
-
-            data = json.loads(result.stdout) if result.stdout else {"Results": []}
+        cmd = ["trivy", "fs", "--format", "json", "--severity", "CRITICAL,HIGH,MEDIUM,LOW", str(self.target)]
+        timeout = 120
 
-            vulnerabilities = []
-            for res in data.get("Results", []):
-                for vuln in res.get("Vulnerabilities", []):
-                    # Extract fix version
-                    fixed_version = vuln.get("FixedVersion", "")
-                    installed_version = vuln.get("InstalledVersion", "")
-
-                    vulnerabilities.append({
-                        "scan_type": "dependency",
-                        "severity": vuln.get("Severity", "UNKNOWN"),
-                        "package": vuln.get("PkgName", "unknown"),
-                        "vulnerability": vuln.get("VulnerabilityID", ""),
-                        "description": vuln.get("Title", ""),
-                        "file": res.get("Target", ""),
-                        "line": None,
-                        "installed_version": installed_version,
-                        "fixed_version": fixed_version
-                    })
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+            # A streamed pipe has no built-in timeout, so kill Trivy if it overruns
+            timed_out = threading.Event()
+
+            def kill():
+                timed_out.set()
+                proc.kill()
+
+            watchdog = threading.Timer(timeout, kill)
+            watchdog.start()
+
+            try:
+                # Parse results as Trivy writes them instead of buffering the whole report
+                vulnerabilities = []
+                if proc.stdout.peek(1):
+                    vulnerabilities = [
+                        {
+                            "scan_type": "dependency",
+                            "severity": parse_severity(vuln.get("Severity")),
+                            "package": vuln.get("PkgName", "unknown"),
+                            "vulnerability": vuln.get("VulnerabilityID", ""),
+                            "description": vuln.get("Title", ""),
+                            "file": res.get("Target", ""),
+                            "line": None,
+                            "installed_version": vuln.get("InstalledVersion", ""),
+                            "fixed_version": vuln.get("FixedVersion", "")
+                        }
+                        for res in ijson.items(proc.stdout, "Results.item")
+                        for vuln in res.get("Vulnerabilities") or []
+                    ]
+            finally:
+                proc.stdout.close()
+                # Keep the watchdog armed so a Trivy that outlives its pipe is still killed
+                proc.wait()
+                watchdog.cancel()
+                if timed_out.is_set():
+                    # Report the timeout rather than the truncated-JSON error it causes
+                    raise subprocess.TimeoutExpired(cmd, timeout)
+
+            if proc.returncode not in [0, 1]:  # 1 means vulnerabilities found
+                print(f"Warning: Trivy exited with code {proc.returncode}")
 
             print(f"✓ Trivy: Found {len(vulnerabilities)} vulnerabilities")
             return vulnerabilities
@@ -111,7 +182,7 @@ class Scanner:
         except subprocess.TimeoutExpired:
             print("✗ Trivy scan timed out")
             return []
-        except json.JSONDecodeError:
+        except ijson.JSONError:
             print("✗ Could not parse Trivy output")
             return []
         except Exception as e:
@@ -122,32 +193,43 @@ class Scanner:
         """Run Gitleaks secret scan"""
         print(f"\nRunning Gitleaks scan on {self.target}...")
 
+        # Older Gitleaks releases treat "-" or /dev/stdout as a plain file name,
+        # so the report always goes to a real temp file
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            report_path = Path(tmp.name)
+
         try:
             result = subprocess.run(
-                ["gitleaks", "detect", "--source", str(self.target), "--report-format", "json", "--report-path", "/dev/stdout", "--no-git"],
+                ["gitleaks", "detect", "--source", str(self.target), "--report-format", "json", "--report-path", str(report_path), "--no-git"],
                 capture_output=True,
-                text=True,
                 timeout=60
             )
+            report = report_path.read_bytes()
 
             # Gitleaks exits with 1 if secrets found, which is expected
-            if result.stdout:
-                data = json.loads(result.stdout)
-            else:
+            if report:
+                # orjson parses the raw bytes, skipping a str decode of the report
+                data = orjson.loads(report)
+            elif result.returncode == 0:
                 data = []
+            else:
+                print(f"✗ Gitleaks exited with code {result.returncode} without writing a report")
+                return []
 
             vulnerabilities = []
             if isinstance(data, list):
-                for secret in data:
-                    vulnerabilities.append({
+                vulnerabilities = [
+                    {
                         "scan_type": "secret",
-                        "severity": "CRITICAL",
+                        "severity": Severity.CRITICAL,
                         "package": secret.get("RuleID", ""),
                         "vulnerability": secret.get("Description", "Secret detected"),
                         "description": f"Secret found: {secret.get('Secret', '')[:20]}...",
                         "file": secret.get("File", ""),
                         "line": secret.get("StartLine", 0)
-                    })
+                    }
+                    for secret in data
+                ]
 
             print(f"✓ Gitleaks: Found {len(vulnerabilities)} secrets")
             return vulnerabilities
@@ -155,38 +237,48 @@ class Scanner:
         except subprocess.TimeoutExpired:
             print("✗ Gitleaks scan timed out")
             return []
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             print("✗ Could not parse Gitleaks output")
             return []
         except Exception as e:
             print(f"✗ Gitleaks error: {e}")
             return []
+        finally:
+            report_path.unlink(missing_ok=True)
 
     def save_results(self, trivy_vulns, gitleaks_vulns):
         """Save scan results to database"""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.conn.cursor()
 
         # Create scan record
         total_vulns = len(trivy_vulns) + len(gitleaks_vulns)
         status = "FAILED" if total_vulns > 0 else "PASSED"
 
-        c.execute("INSERT INTO scans (target, timestamp, status) VALUES (?, ?, ?)",
-                  (str(self.target), datetime.now().isoformat(), status))
-        scan_id = c.lastrowid
-
-        # Insert vulnerabilities
-        all_vulns = trivy_vulns + gitleaks_vulns
-        for vuln in all_vulns:
-            c.execute("""INSERT INTO vulnerabilities
-                        (scan_id, scan_type, severity, package, vulnerability, description, file, line, installed_version, fixed_version)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                     (scan_id, vuln["scan_type"], vuln["severity"], vuln["package"],
-                      vuln["vulnerability"], vuln["description"], vuln["file"], vuln["line"],
-                      vuln.get("installed_version", ""), vuln.get("fixed_version", "")))
-
-        conn.commit()
-        conn.close()
+        # Write the whole scan in a single transaction (rolled back on error)
+        with self.conn:
+            c.execute("BEGIN")
+
+            c.execute("INSERT INTO scans (target, timestamp, status) VALUES (?, ?, ?)",
+                      (str(self.target), datetime.now().isoformat(), status))
+            scan_id = c.lastrowid
+
+            # Insert vulnerabilities
+            rows = [(scan_id, vuln["scan_type"], vuln["severity"].name, vuln["package"],
+                     vuln["vulnerability"], vuln["description"], vuln["file"], vuln["line"],
+                     vuln.get("installed_version", ""), vuln.get("fixed_version", ""))
+                    for vuln in trivy_vulns + gitleaks_vulns]
+            c.executemany("""INSERT INTO vulnerabilities
+                            (scan_id, scan_type, severity, package, vulnerability, description, file, line, installed_version, fixed_version)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+
+            # Materialize severity counts so the dashboard doesn't re-aggregate
+            c.execute("""INSERT INTO scan_summaries
+                        (scan_id, scan_type, critical, high, medium, low, total)
+                        SELECT scan_id, scan_type,
+                               SUM(severity = 'CRITICAL'), SUM(severity = 'HIGH'),
+                               SUM(severity = 'MEDIUM'), SUM(severity = 'LOW'), COUNT(*)
+                        FROM vulnerabilities WHERE scan_id = ?
+                        GROUP BY scan_type""", (scan_id,))
 
         return scan_id
 
@@ -203,14 +295,19 @@ class Scanner:
 
         self.check_dependencies()
 
-        trivy_vulns = self.run_trivy()
-        gitleaks_vulns = self.run_gitleaks()
+        # Both scanners are independent external processes, so run them side by side
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            trivy_future = executor.submit(self.run_trivy)
+            gitleaks_future = executor.submit(self.run_gitleaks)
+        trivy_vulns = trivy_future.result()
+        gitleaks_vulns = gitleaks_future.result()
 
         scan_id = self.save_results(trivy_vulns, gitleaks_vulns)
 
         total = len(trivy_vulns) + len(gitleaks_vulns)
-        critical = sum(1 for v in trivy_vulns + gitleaks_vulns if v["severity"] == "CRITICAL")
-        high = sum(1 for v in trivy_vulns + gitleaks_vulns if v["severity"] == "HIGH")
+        severities = Counter(v["severity"] for v in chain(trivy_vulns, gitleaks_vulns))
+        critical = severities[Severity.CRITICAL]
+        high = severities[Severity.HIGH]
 
         print(f"\n{'='*60}")
         print(f"Scan Complete (ID: {scan_id})")
@@ -221,6 +318,21 @@ class Scanner:
 
         return scan_id
 
+def serve_dashboard(dashboard_path):
+    """Serve the dashboard from this process instead of spawning a new interpreter"""
+    import importlib.util
+    import uvicorn
+
+    # dashboard/app.py imports its siblings by flat name, and the project root
+    # has its own app.py, so load it from its path under a distinct module name
+    sys.path.insert(0, str(dashboard_path.parent))
+    spec = importlib.util.spec_from_file_location("orbit_sec_dashboard", dashboard_path)
+    dashboard = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(dashboard)
+
+    config = uvicorn.Config(dashboard.app, host="0.0.0.0", port=8000, log_level="warning")
+    uvicorn.Server(config).run()
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python orbit-sec.py <path-to-project>")
@@ -233,6 +345,7 @@ def main():
     target = sys.argv[1]
     scanner = Scanner(target)
     scan_id = scanner.scan()
+    scanner.close()
 
     print("\nLaunching dashboard...")
     print("Dashboard: http://localhost:8000")
@@ -244,7 +357,7 @@ def main():
         try:
             time.sleep(2)
             webbrowser.open("http://localhost:8000")
-            subprocess.run(["python3", str(dashboard_path)])
+            serve_dashboard(dashboard_path)
         except KeyboardInterrupt:
             print("\nShutting down...")
     else: